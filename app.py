@@ -10,13 +10,22 @@ A web interface for managing and posting to social media with:
 """
 
 import os
+import re
 import sys
+import codecs
+import atexit
+import logging
 import requests
 import threading
 import time
 import sqlite3
+import json
+import hashlib
 import feedparser
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 from io import BytesIO
@@ -25,22 +34,38 @@ from flask import Flask, render_template, request, redirect, url_for, flash, jso
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
+from contextlib import contextmanager
 
 from atproto import Client, models
 from mastodon import Mastodon
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
 
 # Configuration
-TOPOST_FILE = 'topost.txt'
+TOPOST_FILE = 'topost.txt'  # Legacy queue file, imported into the database on startup
 POSTED_FILE = 'posted.txt'
 IMAGES_FOLDER = 'images'
 UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 DATABASE = 'microblog.db'
+DB_POOL_SIZE = 8
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+MAX_IMAGE_DOWNLOAD = 10 * 1024 * 1024  # 10MB max remote image size
+MAX_IMAGE_DOWNLOAD_PIXELS = 50_000_000  # Refuse remote images bigger than this before decoding
+HTTP_CACHE_MAX_AGE_DAYS = 30  # Forget conditional GET validators not refreshed in this long
 post_lock = threading.Lock()
 last_auto_post_time = time.time()
 
+# Shared worker pool so Bluesky and Mastodon requests run side by side
+_post_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='social')
+
+# Shared HTTP session so page and image fetches reuse keep-alive connections
+_http = requests.Session()
+_http.headers.update({'User-Agent': USER_AGENT})
+_http_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20,
+                            max_retries=Retry(total=2, backoff_factor=0.2))
+_http.mount('http://', _http_adapter)
+_http.mount('https://', _http_adapter)
+
 # Flask app setup
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'change-this-secret-key-in-production')
@@ -52,163 +77,301 @@ os.makedirs(IMAGES_FOLDER, exist_ok=True)
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Database functions
+# Connections are kept open and handed out from a small pool instead of being
+# opened per call. The dev server starts a new thread per request, so a pool
+# (rather than a thread-local) is what actually gets reused.
+_db_pool = []
+_db_pool_lock = threading.Lock()
+
+def _connect():
+    """Open a new database connection with our PRAGMAs applied"""
+    conn = sqlite3.connect(DATABASE, check_same_thread=False, isolation_level=None)
+    # journal_mode is persistent and set once in init_db; these are per-connection
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-40000')
+    conn.execute('PRAGMA mmap_size=268435456')
+    return conn
+
+@contextmanager
+def get_conn():
+    """Borrow a pooled database connection (autocommit mode)"""
+    with _db_pool_lock:
+        conn = _db_pool.pop() if _db_pool else None
+    if conn is None:
+        conn = _connect()
+    try:
+        yield conn
+    finally:
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        with _db_pool_lock:
+            if len(_db_pool) < DB_POOL_SIZE:
+                _db_pool.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+def close_db_pool():
+    """Close all pooled database connections"""
+    with _db_pool_lock:
+        while _db_pool:
+            _db_pool.pop().close()
+
+atexit.register(close_db_pool)
+
 def init_db():
     """Initialize the database with required tables"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    
-    # Settings table
-    c.execute('''CREATE TABLE IF NOT EXISTS settings
-                 (key TEXT PRIMARY KEY, value TEXT)''')
-    
-    # Users table
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT UNIQUE NOT NULL,
-                  password_hash TEXT NOT NULL,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # RSS feeds table - UPDATED with auto_queue, auto_post_mode, and last_checked
-    c.execute('''CREATE TABLE IF NOT EXISTS rss_feeds
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  url TEXT UNIQUE NOT NULL,
-                  name TEXT,
-                  auto_queue INTEGER DEFAULT 0,
-                  auto_post_mode TEXT DEFAULT 'queue',
-                  last_checked TIMESTAMP,
-                  added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # Migration: Add auto_post_mode column if it doesn't exist
-    try:
-        c.execute("SELECT auto_post_mode FROM rss_feeds LIMIT 1")
-    except sqlite3.OperationalError:
-        c.execute("ALTER TABLE rss_feeds ADD COLUMN auto_post_mode TEXT DEFAULT 'queue'")
-    
-    # RSS entries tracking table - NEW
-    c.execute('''CREATE TABLE IF NOT EXISTS rss_seen_entries
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  feed_id INTEGER NOT NULL,
-                  entry_link TEXT NOT NULL,
-                  seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                  UNIQUE(feed_id, entry_link),
-                  FOREIGN KEY(feed_id) REFERENCES rss_feeds(id) ON DELETE CASCADE)''')
-    
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        c = conn.cursor()
+        
+        # WAL lets readers run alongside the background writers
+        c.execute('PRAGMA journal_mode=WAL')
+        
+        # Settings table
+        c.execute('''CREATE TABLE IF NOT EXISTS settings
+                     (key TEXT PRIMARY KEY, value TEXT)''')
+        
+        # Bumped by triggers on every settings write (including ones made by
+        # other workers or the debug scripts) so cached settings can be refreshed
+        c.execute('''CREATE TABLE IF NOT EXISTS settings_version
+                     (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)''')
+        c.execute('INSERT OR IGNORE INTO settings_version (id, version) VALUES (1, 0)')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS settings_version_{event.lower()} AFTER {event} ON settings BEGIN
+                            UPDATE settings_version SET version = version + 1 WHERE id = 1;
+                          END''')
+        
+        # Users table
+        c.execute('''CREATE TABLE IF NOT EXISTS users
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      username TEXT UNIQUE NOT NULL,
+                      password_hash TEXT NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        
+        # RSS feeds table - UPDATED with auto_queue, auto_post_mode, and last_checked
+        c.execute('''CREATE TABLE IF NOT EXISTS rss_feeds
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      url TEXT UNIQUE NOT NULL,
+                      name TEXT,
+                      auto_queue INTEGER DEFAULT 0,
+                      auto_post_mode TEXT DEFAULT 'queue',
+                      last_checked TIMESTAMP,
+                      added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        
+        # Migration: Add auto_post_mode column if it doesn't exist
+        try:
+            c.execute("SELECT auto_post_mode FROM rss_feeds LIMIT 1")
+        except sqlite3.OperationalError:
+            c.execute("ALTER TABLE rss_feeds ADD COLUMN auto_post_mode TEXT DEFAULT 'queue'")
+        
+        # get_rss_feeds orders by added_at
+        c.execute('CREATE INDEX IF NOT EXISTS idx_rss_feeds_added_at ON rss_feeds(added_at)')
+        
+        # Validators and parsed results for conditional GETs of pages and feeds.
+        # kind ('page' or 'feed') keeps the two kinds of parsed body apart
+        try:
+            c.execute("SELECT kind FROM http_cache LIMIT 1")
+        except sqlite3.OperationalError:
+            # Migration: The old table had no kind column. It is only a cache, so start over
+            c.execute('DROP TABLE IF EXISTS http_cache')
+        c.execute('''CREATE TABLE IF NOT EXISTS http_cache
+                     (kind TEXT NOT NULL,
+                      url TEXT NOT NULL,
+                      etag TEXT,
+                      last_modified TEXT,
+                      body TEXT,
+                      fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      PRIMARY KEY (kind, url))''')
+        
+        # set_http_cache prunes by age
+        c.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_fetched_at ON http_cache(fetched_at)')
+        
+        # Posting queue, popped oldest first by the auto-poster
+        c.execute('''CREATE TABLE IF NOT EXISTS queue
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      content TEXT NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        
+        # Posted entries (posted.txt is kept as an append-only log)
+        c.execute('''CREATE TABLE IF NOT EXISTS posts
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      timestamp TEXT NOT NULL,
+                      url TEXT,
+                      headline TEXT,
+                      image TEXT,
+                      summary TEXT,
+                      commentary TEXT)''')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_posts_timestamp ON posts(timestamp DESC)')
+        # Matches the URL normalization used for duplicate checks
+        c.execute("CREATE INDEX IF NOT EXISTS idx_posts_url ON posts(lower(rtrim(url, '/')))")
+        
+        # Full-text search index over posted entries. It reads its text from
+        # the posts table and triggers keep it in step, so nothing is stored twice
+        fts_sql = c.execute("SELECT sql FROM sqlite_master WHERE name = 'posted_fts'").fetchone()
+        if fts_sql and 'content=' not in fts_sql[0]:
+            # Migration: Replace the old standalone index that kept its own copy
+            c.execute('DROP TABLE IF EXISTS posted_fts')
+            fts_sql = None
+        c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS posted_fts USING fts5
+                     (headline, summary, commentary,
+                      content='posts', content_rowid='id',
+                      tokenize='porter unicode61')''')
+        if not fts_sql:
+            c.execute("INSERT INTO posted_fts(posted_fts) VALUES ('rebuild')")
+        
+        c.execute('''CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+                         INSERT INTO posted_fts (rowid, headline, summary, commentary)
+                         VALUES (new.id, new.headline, new.summary, new.commentary);
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+                         INSERT INTO posted_fts (posted_fts, rowid, headline, summary, commentary)
+                         VALUES ('delete', old.id, old.headline, old.summary, old.commentary);
+                     END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE ON posts BEGIN
+                         INSERT INTO posted_fts (posted_fts, rowid, headline, summary, commentary)
+                         VALUES ('delete', old.id, old.headline, old.summary, old.commentary);
+                         INSERT INTO posted_fts (rowid, headline, summary, commentary)
+                         VALUES (new.id, new.headline, new.summary, new.commentary);
+                     END''')
+        
+        # RSS entries tracking table - NEW
+        c.execute('''CREATE TABLE IF NOT EXISTS rss_seen_entries
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                      feed_id INTEGER NOT NULL,
+                      entry_link TEXT NOT NULL,
+                      seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      UNIQUE(feed_id, entry_link),
+                      FOREIGN KEY(feed_id) REFERENCES rss_feeds(id) ON DELETE CASCADE)''')
+
+# Settings are read on nearly every request but rarely change, so the
+# whole table is cached and only reloaded when settings_version moves
+_settings_cache = None
+_settings_version = None
+_settings_lock = threading.Lock()
+
+def _load_settings():
+    """Get the cached settings dict, loading it from the database if needed"""
+    global _settings_cache, _settings_version
+    with _settings_lock:
+        if _settings_cache is None:
+            with get_conn() as conn:
+                # Read the version first so a write landing in between only
+                # causes one extra reload rather than a stale cache
+                _settings_version = conn.execute('SELECT version FROM settings_version').fetchone()[0]
+                _settings_cache = dict(conn.execute('SELECT key, value FROM settings').fetchall())
+        return _settings_cache
+
+def refresh_settings():
+    """Drop the settings cache if the settings table changed since it was loaded"""
+    global _settings_cache
+    with get_conn() as conn:
+        version = conn.execute('SELECT version FROM settings_version').fetchone()[0]
+    with _settings_lock:
+        if version != _settings_version:
+            _settings_cache = None
 
 def get_setting(key, default=None):
     """Get a setting from the database"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT value FROM settings WHERE key = ?', (key,))
-    result = c.fetchone()
-    conn.close()
-    return result[0] if result else default
+    value = _load_settings().get(key)
+    return value if value is not None else default
 
 def set_setting(key, value):
     """Set a setting in the database"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
-    conn.commit()
-    conn.close()
+    set_settings({key: value})
+
+def set_settings(values):
+    """Set several settings in one transaction"""
+    global _settings_cache
+    with _settings_lock:
+        with get_conn() as conn:
+            conn.execute('BEGIN')
+            conn.executemany('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', values.items())
+            conn.execute('COMMIT')
+        # Reload on the next read rather than patching the dict, which may
+        # have been dropped by refresh_settings() or miss other writers' changes
+        _settings_cache = None
 
 def get_user(username):
     """Get a user from the database"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT id, username, password_hash FROM users WHERE username = ?', (username,))
-    result = c.fetchone()
-    conn.close()
+    with get_conn() as conn:
+        result = conn.execute('SELECT id, username, password_hash FROM users WHERE username = ?',
+                              (username,)).fetchone()
     return {'id': result[0], 'username': result[1], 'password_hash': result[2]} if result else None
 
 def create_user(username, password):
     """Create a new user"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
     password_hash = generate_password_hash(password)
-    try:
-        c.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)', (username, password_hash))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False
+    with get_conn() as conn:
+        try:
+            conn.execute('INSERT INTO users (username, password_hash) VALUES (?, ?)', (username, password_hash))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+# Users are never deleted, so once one exists there's no need to ask again
+_have_user = False
 
 def user_exists():
     """Check if any user exists in the database"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM users')
-    count = c.fetchone()[0]
-    conn.close()
-    return count > 0
+    global _have_user
+    if not _have_user:
+        with get_conn() as conn:
+            _have_user = conn.execute('SELECT 1 FROM users LIMIT 1').fetchone() is not None
+    return _have_user
+
+# Checked against when the username is unknown, so a failed login costs the
+# same hash computation whether or not the user exists
+_DUMMY_PASSWORD_HASH = generate_password_hash('dummy-password')
+
+# HTTP cache functions
+def get_http_cache(kind, url):
+    """Get the cached validators and parsed body for a URL fetched as a 'page' or 'feed'"""
+    with get_conn() as conn:
+        result = conn.execute('SELECT etag, last_modified, body FROM http_cache WHERE kind = ? AND url = ?',
+                              (kind, url)).fetchone()
+    return {'etag': result[0], 'last_modified': result[1], 'body': result[2]} if result else None
+
+def set_http_cache(kind, url, etag, last_modified, body):
+    """Store validators and the parsed (JSON) body for a URL fetched as a 'page' or 'feed'"""
+    if not etag and not last_modified:
+        # Nothing to revalidate with, so there is no point keeping it
+        return
+    with get_conn() as conn:
+        conn.execute('''INSERT OR REPLACE INTO http_cache (kind, url, etag, last_modified, body, fetched_at)
+                        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)''', (kind, url, etag, last_modified, body))
+        
+        # Most pages are only fetched around the time they're posted, so
+        # drop anything that hasn't been refreshed in a while
+        conn.execute("DELETE FROM http_cache WHERE fetched_at < datetime('now', ?)",
+                     (f'-{HTTP_CACHE_MAX_AGE_DAYS} days',))
 
 def is_duplicate_link(url):
-    """Check if a URL already exists in posted.txt or topost.txt"""
+    """Check if a URL already exists in the posted archive or the queue"""
+    return get_link_status(url) is not None
+
+def get_link_status(url):
+    """Get 'posted' or 'queued' if a URL was already used, otherwise None"""
     if not url:
-        return False
+        return None
     
     # Normalize URL (remove trailing slashes, convert to lowercase for comparison)
     normalized_url = url.rstrip('/').lower()
     
-    # Check posted.txt
-    try:
-        with open(POSTED_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                parsed = parse_posted_line(line)
-                if parsed and parsed.get('url'):
-                    existing_url = parsed['url'].rstrip('/').lower()
-                    if existing_url == normalized_url:
-                        return True
-    except FileNotFoundError:
-        pass
+    # Check the posted archive, this is an index lookup on idx_posts_url
+    with get_conn() as conn:
+        result = conn.execute("SELECT 1 FROM posts WHERE lower(rtrim(url, '/')) = ? LIMIT 1",
+                              (normalized_url,)).fetchone()
+    if result:
+        return 'posted'
     
-    # Check topost.txt
-    try:
-        with open(TOPOST_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Parse the content to extract URL
-                parsed = parse_content(line)
-                if parsed['type'] == 'url':
-                    existing_url = parsed['url'].rstrip('/').lower()
-                    if existing_url == normalized_url:
-                        return True
-    except FileNotFoundError:
-        pass
-    
-    return False
-
-def get_link_status(url):
-    if not url:
-        return None
-    normalized_url = url.rstrip('/').lower()
-    try:
-        with open(POSTED_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                parsed = parse_posted_line(line)
-                if parsed and parsed.get('url'):
-                    if parsed['url'].rstrip('/').lower() == normalized_url:
-                        return 'posted'
-    except FileNotFoundError:
-        pass
-    try:
-        with open(TOPOST_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                parsed = parse_content(line)
-                if parsed['type'] == 'url':
-                    if parsed['url'].rstrip('/').lower() == normalized_url:
-                        return 'queued'
-    except FileNotFoundError:
-        pass
+    # Check the queue
+    for content in get_queue_entries():
+        parsed = parse_content(content)
+        if parsed['type'] == 'url':
+            if parsed['url'].rstrip('/').lower() == normalized_url:
+                return 'queued'
     return None
 
 
@@ -217,87 +380,82 @@ def get_link_status(url):
 # RSS feed functions
 def add_rss_feed(url, name=None, auto_queue=False, auto_post_mode='queue'):
     """Add an RSS feed to the database"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    try:
-        c.execute('INSERT INTO rss_feeds (url, name, auto_queue, auto_post_mode) VALUES (?, ?, ?, ?)', 
-                  (url, name, 1 if auto_queue else 0, auto_post_mode))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False
+    with get_conn() as conn:
+        try:
+            conn.execute('INSERT INTO rss_feeds (url, name, auto_queue, auto_post_mode) VALUES (?, ?, ?, ?)', 
+                         (url, name, 1 if auto_queue else 0, auto_post_mode))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+def _rss_feed_from_row(row):
+    """Turn an rss_feeds row into a feed dict"""
+    return {'id': row[0], 'url': row[1], 'name': row[2], 'auto_queue': bool(row[3]),
+            'auto_post_mode': row[4] if len(row) > 4 and row[4] else 'queue'}
 
 def get_rss_feeds():
     """Get all RSS feeds from the database"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT id, url, name, auto_queue, auto_post_mode FROM rss_feeds ORDER BY added_at DESC')
-    feeds = [{'id': row[0], 'url': row[1], 'name': row[2], 'auto_queue': bool(row[3]), 
-              'auto_post_mode': row[4] if len(row) > 4 and row[4] else 'queue'} 
-             for row in c.fetchall()]
-    conn.close()
-    return feeds
+    with get_conn() as conn:
+        rows = conn.execute('SELECT id, url, name, auto_queue, auto_post_mode FROM rss_feeds ORDER BY added_at DESC').fetchall()
+    return [_rss_feed_from_row(row) for row in rows]
+
+def get_rss_feed(feed_id):
+    """Get a single RSS feed by id, or None"""
+    with get_conn() as conn:
+        row = conn.execute('SELECT id, url, name, auto_queue, auto_post_mode FROM rss_feeds WHERE id = ?',
+                           (feed_id,)).fetchone()
+    return _rss_feed_from_row(row) if row else None
 
 def update_rss_feed_auto_queue(feed_id, auto_queue):
     """Update the auto_queue setting for a feed"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('UPDATE rss_feeds SET auto_queue = ? WHERE id = ?', 
-              (1 if auto_queue else 0, feed_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute('UPDATE rss_feeds SET auto_queue = ? WHERE id = ?', 
+                     (1 if auto_queue else 0, feed_id))
 
 def update_rss_feed_auto_post_mode(feed_id, auto_post_mode):
     """Update the auto_post_mode for a feed (queue, social, or local)"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('UPDATE rss_feeds SET auto_post_mode = ? WHERE id = ?', 
-              (auto_post_mode, feed_id))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute('UPDATE rss_feeds SET auto_post_mode = ? WHERE id = ?', 
+                     (auto_post_mode, feed_id))
 
 def update_rss_feed_last_checked(feed_id):
     """Update the last_checked timestamp for a feed"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('UPDATE rss_feeds SET last_checked = CURRENT_TIMESTAMP WHERE id = ?', (feed_id,))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute('UPDATE rss_feeds SET last_checked = CURRENT_TIMESTAMP WHERE id = ?', (feed_id,))
 
 def mark_rss_entry_seen(feed_id, entry_link):
     """Mark an RSS entry as seen"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    try:
-        c.execute('INSERT INTO rss_seen_entries (feed_id, entry_link) VALUES (?, ?)', 
-                  (feed_id, entry_link))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        # Already seen
-        conn.close()
-        return False
+    with get_conn() as conn:
+        try:
+            conn.execute('INSERT INTO rss_seen_entries (feed_id, entry_link) VALUES (?, ?)', 
+                         (feed_id, entry_link))
+            return True
+        except sqlite3.IntegrityError:
+            # Already seen
+            return False
 
 def is_rss_entry_seen(feed_id, entry_link):
     """Check if an RSS entry has been seen"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM rss_seen_entries WHERE feed_id = ? AND entry_link = ?', 
-              (feed_id, entry_link))
-    count = c.fetchone()[0]
-    conn.close()
+    with get_conn() as conn:
+        count = conn.execute('SELECT COUNT(*) FROM rss_seen_entries WHERE feed_id = ? AND entry_link = ?', 
+                             (feed_id, entry_link)).fetchone()[0]
     return count > 0
 
 def fetch_rss_entries(feed_url, limit=15):
     try:
-        feed = feedparser.parse(feed_url)
+        cached = get_http_cache('feed', feed_url)
+        feed = feedparser.parse(feed_url,
+                                etag=cached['etag'] if cached else None,
+                                modified=cached['last_modified'] if cached else None)
+        
+        # Feed unchanged since last fetch, reuse the entries we parsed then
+        if feed.get('status') == 304 and cached:
+            return json.loads(cached['body'])[:limit], None
+        
         if feed.bozo and not feed.entries:
             return None, "Failed to parse RSS feed"
         entries = []
-        for entry in feed.entries[:limit]:
+        for entry in feed.entries:
             entries.append({
                 'title': entry.get('title', 'No title'),
                 'link': entry.get('link', ''),
@@ -305,13 +463,15 @@ def fetch_rss_entries(feed_url, limit=15):
                 'summary': entry.get('summary', ''),
                 'author': entry.get('author', '')
             })
-        return entries, None
+        set_http_cache('feed', feed_url, feed.get('etag'), feed.get('modified'), json.dumps(entries))
+        return entries[:limit], None
     except Exception as e:
         return None, str(e)
 
 def check_and_queue_new_rss_entries():
     """Check all auto-queue feeds for new entries and add them based on auto_post_mode"""
     global last_auto_post_time
+    refresh_settings()
     feeds = get_rss_feeds()
     auto_queue_feeds = [f for f in feeds if f['auto_queue']]
     
@@ -336,8 +496,7 @@ def check_and_queue_new_rss_entries():
                     
                     if auto_post_mode == 'social':
                         # Post directly to social media
-                        if post_to_social_media(content):
-                            add_to_posted(content)
+                        if publish_post(content):
                             print(f"Auto-posted to socials from {feed['name'] or feed['url']}: {entry['title']}")
                             last_auto_post_time = time.time()
                         else:
@@ -348,8 +507,7 @@ def check_and_queue_new_rss_entries():
                         print(f"Auto-posted locally from {feed['name'] or feed['url']}: {entry['title']}")
                     else:
                         # Default: add to queue
-                        with open(TOPOST_FILE, 'a', encoding='utf-8') as f:
-                            f.write(f"{content}\n")
+                        enqueue_post(content)
                         print(f"Auto-queued from {feed['name'] or feed['url']}: {entry['title']}")
                     
                     # Mark as seen
@@ -384,6 +542,11 @@ init_db()
 def parse_content_filter(content):
     return parse_content(content)
 
+# Pick up settings written by other workers or the debug scripts
+@app.before_request
+def refresh_settings_cache():
+    refresh_settings()
+
 # Context processor to make site settings available to all templates
 @app.context_processor
 def inject_site_settings():
@@ -400,43 +563,58 @@ last_auto_post_time = time.time()
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def parse_posted_line(line):
-    """Parse a line from posted.txt - new pipe-delimited format only"""
-    if not line.strip():
-        return None
-    
-    # New format: [DATETIME]|url|headline|imageFilename|summary|commentary
-    if not line.startswith('['):
-        return None
-    
-    bracket_end = line.find(']')
-    if bracket_end == -1:
-        return None
+# New format: [DATETIME]|url|headline|imageFilename|summary|commentary
+_POSTED_LINE_RE = re.compile(r'\[([^\]]*)\]\s*\|(.*)', re.DOTALL)
+_IMAGE_EXT_RE = re.compile(r'\.(?:jpg|jpeg|png|gif|webp|bmp|tiff)$', re.IGNORECASE)
+_URL_PREFIXES = ('http://', 'https://', 'www.')
+
+def _posted_field(value):
+    """Normalize a posted.txt field, empty and 'NULL' become None"""
+    value = value.strip()
+    return value if value and value != 'NULL' else None
+
+def _parse_timestamp(value):
+    """Parse a 'YYYY-MM-DD HH:MM:SS' timestamp, or None if malformed
     
-    timestamp_str = line[1:bracket_end]
+    fromisoformat is implemented in C and is far cheaper than strptime, which
+    dominated archive loading. It also accepts other ISO forms (such as a UTC
+    offset), so it only gets text laid out exactly as we write it. Anything
+    else, like unpadded fields, goes through strptime as before.
+    """
+    if (len(value) == 19 and value[4] == value[7] == '-' and value[10] == ' '
+            and value[13] == value[16] == ':'):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
     try:
-        timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-    except:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
         return None
-    
-    # Check for pipe-delimited format
-    rest = line[bracket_end+1:].strip()
-    if not rest.startswith('|'):
+
+def parse_posted_line(line):
+    """Parse a line from posted.txt - new pipe-delimited format only"""
+    match = _POSTED_LINE_RE.match(line)
+    if not match:
         return None
     
-    rest = rest[1:]  # Remove leading pipe
-    parts = rest.split('|')
+    timestamp_str, rest = match.groups()
+    timestamp = _parse_timestamp(timestamp_str)
+    if timestamp is None:
+        return None
     
+    # Anything past the fifth field is ignored
+    parts = rest.split('|', 5)
     if len(parts) < 5:
         return None
     
     return {
         'timestamp': timestamp,
-        'url': parts[0].strip() if parts[0].strip() and parts[0].strip() != 'NULL' else None,
-        'headline': parts[1].strip() if parts[1].strip() and parts[1].strip() != 'NULL' else None,
-        'image': parts[2].strip() if parts[2].strip() and parts[2].strip() != 'NULL' else None,
-        'summary': parts[3].strip() if parts[3].strip() and parts[3].strip() != 'NULL' else None,
-        'commentary': parts[4].strip() if parts[4].strip() and parts[4].strip() != 'NULL' else None,
+        'url': _posted_field(parts[0]),
+        'headline': _posted_field(parts[1]),
+        'image': _posted_field(parts[2]),
+        'summary': _posted_field(parts[3]),
+        'commentary': _posted_field(parts[4]),
         'raw': line
     }
 
@@ -452,139 +630,261 @@ def parse_content(content):
     if '|' not in content:
         return {'type': 'text', 'text': content}
     
-    parts = content.split('|', 1)
-    first_part = parts[0].strip()
-    second_part = parts[1].strip()
+    first_part, second_part = content.split('|', 1)
+    first_part = first_part.strip()
+    second_part = second_part.strip()
+    is_url = first_part.startswith(_URL_PREFIXES)
     
     # Check if it's a local image file FIRST (no http/https prefix)
     # This ensures local image files are properly identified
-    image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff')
-    if not first_part.startswith(('http://', 'https://', 'www.')) and \
-       any(first_part.lower().endswith(ext) for ext in image_extensions):
+    if not is_url and _IMAGE_EXT_RE.search(first_part):
         return {'type': 'image', 'image': first_part, 'text': second_part}
     
     # Check if it's a URL (this includes image URLs from the web)
-    elif first_part.startswith(('http://', 'https://', 'www.')):
+    elif is_url:
         return {'type': 'url', 'url': first_part, 'text': second_part}
     
     # Otherwise it's just text
     else:
         return {'type': 'text', 'text': content}
 
+# Posted entries are served from the posts table. posted.txt is still
+# appended to as a plain-text log of everything that was posted.
+_POST_COLUMNS = 'timestamp, url, headline, image, summary, commentary'
+
+def _post_row_to_entry(row):
+    """Convert a posts row (in _POST_COLUMNS order) to an entry dict"""
+    return {
+        'timestamp': _parse_timestamp(row[0]),
+        'url': row[1],
+        'headline': row[2],
+        'image': row[3],
+        'summary': row[4],
+        'commentary': row[5]
+    }
+
+def read_posted_file():
+    """Parse every entry in posted.txt, oldest first"""
+    entries = []
+    with open(POSTED_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            parsed = parse_posted_line(line)
+            if parsed:  # Only add if parsing succeeded
+                entries.append(parsed)
+    return entries
+
 def get_posted_entries(page=1, per_page=20, search_query=None):
     """Get paginated posted entries with optional search"""
-    try:
-        with open(POSTED_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Parse all lines
-        entries = []
-        for line in reversed(lines):
-            if line.strip():
-                parsed = parse_posted_line(line)
-                if parsed:  # Only add if parsing succeeded
-                    entries.append(parsed)
-        
-        # Filter by search query if provided
-        if search_query:
-            filtered = []
-            for e in entries:
-                search_text = ' '.join(filter(None, [
-                    e.get('headline', ''),
-                    e.get('summary', ''),
-                    e.get('commentary', ''),
-                    e.get('content', '')
-                ])).lower()
-                if search_query.lower() in search_text:
-                    filtered.append(e)
-            entries = filtered
-        
-        # Paginate
-        total = len(entries)
-        start = (page - 1) * per_page
-        end = start + per_page
-        
-        return {
-            'entries': entries[start:end],
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page if total > 0 else 0
-        }
-    except FileNotFoundError:
-        return {'entries': [], 'total': 0, 'page': 1, 'per_page': per_page, 'total_pages': 0}
+    fts_query = _build_fts_query(search_query) if search_query else None
+    if fts_query:
+        return search_posted_entries(fts_query, page, per_page)
+    
+    start = (page - 1) * per_page
+    with get_conn() as conn:
+        total = conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+        rows = conn.execute(f'SELECT {_POST_COLUMNS} FROM posts ORDER BY id DESC LIMIT ? OFFSET ?',
+                            (per_page, max(start, 0))).fetchall()
+    
+    return {
+        'entries': [_post_row_to_entry(row) for row in rows],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': (total + per_page - 1) // per_page if total > 0 else 0
+    }
 
-def get_all_posted_entries():
-    """Get all posted entries without pagination"""
-    try:
-        with open(POSTED_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+def get_posted_entries_since(since=None):
+    """Get posted entries newer than a datetime (or all of them), oldest first"""
+    with get_conn() as conn:
+        if since:
+            rows = conn.execute(f'SELECT {_POST_COLUMNS} FROM posts WHERE timestamp > ? ORDER BY id',
+                                (since.strftime('%Y-%m-%d %H:%M:%S'),)).fetchall()
+        else:
+            rows = conn.execute(f'SELECT {_POST_COLUMNS} FROM posts ORDER BY id').fetchall()
+    return [_post_row_to_entry(row) for row in rows]
+
+def _build_fts_query(search_query):
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    terms = ['"' + term.replace('"', '""') + '"*' for term in search_query.split()]
+    return ' '.join(terms)
+
+def search_posted_entries(fts_query, page=1, per_page=20):
+    """Get paginated posted entries matching an FTS5 query, newest first"""
+    start = (page - 1) * per_page
+    with get_conn() as conn:
+        total = conn.execute('SELECT COUNT(*) FROM posted_fts WHERE posted_fts MATCH ?',
+                             (fts_query,)).fetchone()[0]
+        rows = conn.execute(f'''SELECT {_POST_COLUMNS} FROM posts
+                                WHERE id IN (SELECT rowid FROM posted_fts WHERE posted_fts MATCH ?)
+                                ORDER BY id DESC LIMIT ? OFFSET ?''',
+                            (fts_query, per_page, max(start, 0))).fetchall()
+    
+    return {
+        'entries': [_post_row_to_entry(row) for row in rows],
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': (total + per_page - 1) // per_page if total > 0 else 0
+    }
+
+def _insert_posts(conn, entries):
+    """Store parsed posted entries in the posts table (triggers update the search index)"""
+    rows = [(e['timestamp'].strftime('%Y-%m-%d %H:%M:%S'), e['url'], e['headline'],
+             e['image'], e['summary'], e['commentary'])
+            for e in entries]
+    conn.executemany(f'INSERT INTO posts ({_POST_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+def backfill_posts():
+    """Load posted.txt into the posts table if it's empty"""
+    with get_conn() as conn:
+        if conn.execute('SELECT 1 FROM posts LIMIT 1').fetchone():
+            return
+        try:
+            entries = read_posted_file()
+        except FileNotFoundError:
+            return
         
-        # Parse all lines (reversed so newest first)
-        entries = []
-        for line in reversed(lines):
-            if line.strip():
-                parsed = parse_posted_line(line)
-                if parsed:  # Only add if parsing succeeded
-                    entries.append(parsed)
-        return entries
-    except FileNotFoundError:
-        return []
+        # Every gunicorn worker runs this on import. Take the write lock
+        # first and check again, so only the first worker does the import
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            if not conn.execute('SELECT 1 FROM posts LIMIT 1').fetchone():
+                _insert_posts(conn, entries)
+            conn.execute('COMMIT')
+        except sqlite3.OperationalError as e:
+            print(f"Error importing {POSTED_FILE} into the database: {e}")
+
+def rebuild_posts():
+    """Replace the posts table with the contents of posted.txt"""
+    entries = read_posted_file()
+    with get_conn() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM posts')
+        _insert_posts(conn, entries)
+        conn.execute('COMMIT')
+    return len(entries)
+
+# Import archive entries written before the posts table existed
+backfill_posts()
+
+# posted.txt is only ever appended to, so one O_APPEND descriptor is kept
+# open and each post is a single write() call
+_posted_fd = os.open(POSTED_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+atexit.register(os.close, _posted_fd)
+
+# Queue functions
+def enqueue_post(content):
+    """Add content to the end of the posting queue"""
+    with get_conn() as conn:
+        conn.execute('INSERT INTO queue (content) VALUES (?)', (content,))
+    
+    # The auto-poster stops its timer while the queue is empty, wake it up
+    if _auto_post_started:
+        schedule_auto_post()
 
 def get_queue_entries():
-    """Get entries waiting in topost.txt"""
+    """Get entries waiting in the queue, oldest first"""
+    with get_conn() as conn:
+        rows = conn.execute('SELECT content FROM queue ORDER BY id').fetchall()
+    return [row[0] for row in rows]
+
+def get_queue_count():
+    """Get the number of entries waiting in the queue"""
+    with get_conn() as conn:
+        return conn.execute('SELECT COUNT(*) FROM queue').fetchone()[0]
+
+def get_queue_items():
+    """Get queued entries as dicts with their id and content, oldest first"""
+    with get_conn() as conn:
+        rows = conn.execute('SELECT id, content FROM queue ORDER BY id').fetchall()
+    return [{'id': row[0], 'content': row[1]} for row in rows]
+
+def peek_queue():
+    """Get the (id, content) of the next queued entry, or None"""
+    with get_conn() as conn:
+        return conn.execute('SELECT id, content FROM queue ORDER BY id LIMIT 1').fetchone()
+
+def remove_queued(queue_id):
+    """Remove an entry from the queue by id, returns False if it wasn't there"""
+    with get_conn() as conn:
+        cursor = conn.execute('DELETE FROM queue WHERE id = ?', (queue_id,))
+        return cursor.rowcount > 0
+
+def import_queue_file():
+    """Move entries from an old topost.txt queue file into the queue table"""
+    # Claim the file with an atomic rename first. Every gunicorn worker runs
+    # this on import and only the one whose rename succeeds imports it
+    claimed = f"{TOPOST_FILE}.importing.{os.getpid()}"
     try:
-        with open(TOPOST_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        return [line.strip() for line in lines if line.strip()]
+        os.replace(TOPOST_FILE, claimed)
     except FileNotFoundError:
-        return []
+        return
+    
+    try:
+        with open(claimed, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        
+        with get_conn() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany('INSERT INTO queue (content) VALUES (?)', [(line,) for line in lines])
+            conn.execute('COMMIT')
+    except (OSError, sqlite3.Error) as e:
+        # Put the file back so the next start tries again
+        os.replace(claimed, TOPOST_FILE)
+        print(f"Error importing {TOPOST_FILE}: {e}")
+        return
+    
+    # Keep the old file around but make sure it's never imported twice
+    os.replace(claimed, TOPOST_FILE + '.imported')
+    print(f"Imported {len(lines)} queued posts from {TOPOST_FILE}")
+
+import_queue_file()
+
+# Recently fetched page metadata, so a link queued twice is only looked up once
+METADATA_CACHE_TTL = 3600
+METADATA_CACHE_SIZE = 512
+_metadata_cache = {}
+_metadata_cache_lock = threading.Lock()
+
+def _cache_metadata(url, metadata):
+    """Remember metadata for a URL, dropping the oldest entry when full"""
+    with _metadata_cache_lock:
+        _metadata_cache.pop(url, None)
+        if len(_metadata_cache) >= METADATA_CACHE_SIZE:
+            del _metadata_cache[next(iter(_metadata_cache))]
+        _metadata_cache[url] = (time.monotonic() + METADATA_CACHE_TTL, metadata)
 
 # Social media posting functions (from original script)
 def fetch_page_metadata(url):
     """Fetch page title, description, and featured image from URL"""
+    with _metadata_cache_lock:
+        cached = _metadata_cache.get(url)
+    if cached and cached[0] > time.monotonic():
+        return dict(cached[1])
+    
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        title = None
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text().strip()
+        headers = {}
+        cached = get_http_cache('page', url)
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
         
-        og_title = soup.find('meta', property='og:title')
-        if og_title and og_title.get('content'):
-            title = og_title.get('content').strip()
+        response = _http.get(url, headers=headers, timeout=10)
         
-        description = None
-        og_desc = soup.find('meta', property='og:description')
-        if og_desc and og_desc.get('content'):
-            description = og_desc.get('content').strip()
+        # Page unchanged since we last parsed it
+        if response.status_code == 304 and cached:
+            metadata = json.loads(cached['body'])
         else:
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                description = meta_desc.get('content').strip()
-        
-        image_url = None
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            image_url = og_image.get('content').strip()
-            image_url = urljoin(url, image_url)
-        
-        if not image_url:
-            twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-            if twitter_image and twitter_image.get('content'):
-                image_url = twitter_image.get('content').strip()
-                image_url = urljoin(url, image_url)
+            response.raise_for_status()
+            
+            metadata = _parse_page_metadata(url, response.content)
+            set_http_cache('page', url, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                           json.dumps(metadata))
         
-        return {
-            'title': title or url,
-            'description': description or '',
-            'image_url': image_url
-        }
+        _cache_metadata(url, metadata)
+        return dict(metadata)
     except Exception as e:
         print(f"Error fetching metadata for {url}: {e}")
         return {
@@ -593,6 +893,104 @@ def fetch_page_metadata(url):
             'image_url': None
         }
 
+# Metadata tags all live in <head>, so nothing after it needs parsing
+_HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+def _meta_content(tree, attr, value):
+    """Get the first non-empty content of a <meta> tag matched by attribute"""
+    for content in tree.xpath(f'//meta[@{attr}=$value]/@content', value=value):
+        if content.strip():
+            return content.strip()
+    return None
+
+def _parse_page_metadata(url, html):
+    """Extract title, description, and featured image from page HTML"""
+    head_end = _HEAD_END_RE.search(html)
+    head = html[:head_end.start()] if head_end else html
+    if not head.strip():
+        return {'title': url, 'description': '', 'image_url': None}
+    
+    # Pick the encoding ourselves, libxml2 assumes Latin-1 when there's no declaration
+    charset = _CHARSET_RE.search(head)
+    try:
+        encoding = codecs.lookup(charset.group(1).decode('ascii')).name if charset else 'utf-8'
+    except LookupError:
+        encoding = 'utf-8'
+    tree = lxml_html.fromstring(head, parser=lxml_html.HTMLParser(encoding=encoding))
+    
+    title = None
+    title_tag = tree.find('.//title')
+    if title_tag is not None and title_tag.text_content().strip():
+        title = title_tag.text_content().strip()
+    title = _meta_content(tree, 'property', 'og:title') or title
+    
+    description = (_meta_content(tree, 'property', 'og:description') or
+                   _meta_content(tree, 'name', 'description'))
+    
+    image_url = (_meta_content(tree, 'property', 'og:image') or
+                 _meta_content(tree, 'name', 'twitter:image'))
+    if image_url:
+        image_url = urljoin(url, image_url)
+    
+    return {
+        'title': title or url,
+        'description': description or '',
+        'image_url': image_url
+    }
+
+def _decode_image(data, max_pixels=None):
+    """Decode image bytes into an RGB-compatible PIL image"""
+    img = Image.open(BytesIO(data))
+    
+    # Only the header has been read so far, so an oversized image is
+    # refused before it can take up any memory
+    if max_pixels and img.width * img.height > max_pixels:
+        raise ValueError(f"image is {img.width}x{img.height}, over {max_pixels} pixels")
+    
+    # JPEGs can be decoded straight at reduced scale. Both outputs we make
+    # (1200px for posting, 600x400 crop for the archive) fit within this.
+    img.draft('RGB', (1200, 1200))
+    
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGB')
+    img.load()
+    return img
+
+def encode_post_image(img):
+    """Shrink an image to fit 1200x1200 and encode it as JPEG bytes"""
+    max_size = (1200, 1200)
+    if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
+        img = img.copy()  # thumbnail() works in place, keep the caller's image intact
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    
+    img_bytes = BytesIO()
+    img.save(img_bytes, format='JPEG', quality=85)
+    return img_bytes.getvalue()
+
+def save_link_thumbnail(img, image_path):
+    """Center-crop an image to 3:2 and save it as a 600x400 JPEG"""
+    # Calculate crop to 3:2 ratio
+    target_ratio = 600 / 400  # 1.5
+    img_ratio = img.width / img.height
+    
+    if img_ratio > target_ratio:
+        # Image is wider, crop width
+        new_width = int(img.height * target_ratio)
+        left = (img.width - new_width) // 2
+        crop_box = (left, 0, left + new_width, img.height)
+    else:
+        # Image is taller, crop height
+        new_height = int(img.width / target_ratio)
+        top = (img.height - new_height) // 2
+        crop_box = (0, top, img.width, top + new_height)
+    
+    # Crop and resize in one pass; reducing_gap does most of the
+    # shrinking with a cheap box reduce first
+    thumb = img.resize((600, 400), Image.Resampling.LANCZOS,
+                       box=crop_box, reducing_gap=3.0)
+    thumb.save(image_path, format='JPEG', quality=85)
+
 def load_local_image(filename):
     """Load and process a local image file"""
     try:
@@ -605,49 +1003,54 @@ def load_local_image(filename):
         with open(image_path, 'rb') as f:
             image_data = f.read()
         
-        img = Image.open(BytesIO(image_data))
-        
-        if img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
-        
-        max_size = (1200, 1200)
-        if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        img_bytes = BytesIO()
-        img.save(img_bytes, format='JPEG', quality=85)
-        img_bytes.seek(0)
-        
-        return img_bytes.getvalue()
+        return encode_post_image(_decode_image(image_data))
     except Exception as e:
         print(f"Error loading local image {filename}: {e}")
         return None
 
-def download_and_process_image(image_url):
-    """Download and process image"""
+def download_image(image_url):
+    """Download and decode an image, returns a PIL image or None"""
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(image_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        img = Image.open(BytesIO(response.content))
-        
-        if img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
-        
-        max_size = (1200, 1200)
-        if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        img_bytes = BytesIO()
-        img.save(img_bytes, format='JPEG', quality=85)
-        img_bytes.seek(0)
+        with _http.get(image_url, stream=True, timeout=15) as response:
+            response.raise_for_status()
+            
+            # Bail out early on anything too big instead of buffering it all
+            if int(response.headers.get('Content-Length') or 0) > MAX_IMAGE_DOWNLOAD:
+                print(f"Skipping image {image_url}: too large")
+                return None
+            
+            buf = BytesIO()
+            for chunk in response.iter_content(65536):
+                if buf.tell() + len(chunk) > MAX_IMAGE_DOWNLOAD:
+                    print(f"Skipping image {image_url}: too large")
+                    return None
+                buf.write(chunk)
         
-        return img_bytes.getvalue()
+        return _decode_image(buf.getbuffer(), MAX_IMAGE_DOWNLOAD_PIXELS)
     except Exception as e:
         print(f"Error processing image {image_url}: {e}")
         return None
 
+def download_and_process_image(image_url):
+    """Download and process image"""
+    img = download_image(image_url)
+    return encode_post_image(img) if img is not None else None
+
+def prepare_link_preview(content):
+    """Fetch a link post's metadata and featured image once
+    
+    The result can be passed to both post_to_social_media and add_to_posted
+    so the page and image are only downloaded and decoded a single time.
+    Returns None for non-link content.
+    """
+    parsed = parse_content(content)
+    if parsed['type'] != 'url':
+        return None
+    
+    metadata = fetch_page_metadata(parsed['url'])
+    image = download_image(metadata['image_url']) if metadata['image_url'] else None
+    return {'metadata': metadata, 'image': image}
+
 def upload_image_to_bluesky(client, image_data):
     """Upload image to Bluesky"""
     try:
@@ -775,8 +1178,109 @@ def create_simple_mastodon_post(mastodon_client, text):
         print(f"Error creating simple Mastodon post: {e}")
         return None
 
-def post_to_social_media(content):
-    """Post content to Bluesky and Mastodon"""
+# Logged-in clients keyed by network and credentials, so each post reuses
+# the session and HTTP connections of the last one
+_social_clients = {}
+_social_clients_lock = threading.Lock()
+
+def _get_social_client(key, factory, *args, **kwargs):
+    """Get a cached client for key, creating it with factory on first use"""
+    with _social_clients_lock:
+        client = _social_clients.get(key)
+    if client is None:
+        client = factory(*args, **kwargs)
+        with _social_clients_lock:
+            _social_clients[key] = client
+    return client
+
+def _login_bluesky(handle, password):
+    """Create a logged-in Bluesky client"""
+    client = Client()
+    client.login(handle, password)
+    return client
+
+def _post_to_bluesky(client, parsed, metadata=None, image_data=None):
+    """Send a parsed post to Bluesky (raises on failure)"""
+    text_content = parsed['text']
+    
+    if parsed['type'] == 'url':
+        # Post with link card embed
+        external_embed = models.AppBskyEmbedExternal.External(
+            uri=parsed['url'],
+            title=metadata['title'][:300],
+            description=metadata['description'][:1000] if metadata['description'] else ''
+        )
+        
+        # Add thumbnail if available
+        if image_data:
+            blob = upload_image_to_bluesky(client, image_data)
+            if blob:
+                external_embed.thumb = blob.blob
+        
+        embed = models.AppBskyEmbedExternal.Main(external=external_embed)
+        client.send_post(text=text_content, embed=embed)
+    
+    elif parsed['type'] == 'image':
+        # Don't let an image post count as sent when the image never went out
+        if not image_data:
+            raise ValueError(f"Could not load image {parsed['image']}")
+        blob = upload_image_to_bluesky(client, image_data)
+        if not blob:
+            raise ValueError(f"Could not upload image {parsed['image']}")
+        image_embed = models.AppBskyEmbedImages.Image(alt="", image=blob.blob)
+        embed = models.AppBskyEmbedImages.Main(images=[image_embed])
+        client.send_post(text=text_content, embed=embed)
+    
+    else:
+        # Text only
+        client.send_post(text=text_content)
+
+def _post_to_mastodon(mastodon_client, parsed, image_data=None):
+    """Send a parsed post to Mastodon (raises on failure)"""
+    text_content = parsed['text']
+    
+    if parsed['type'] == 'url':
+        post_text = f"{text_content}\n\n{parsed['url']}"
+        if image_data:
+            media_dict = mastodon_client.media_post(image_data, mime_type='image/jpeg')
+            mastodon_client.status_post(post_text, media_ids=[media_dict['id']])
+        else:
+            mastodon_client.status_post(post_text)
+    
+    elif parsed['type'] == 'image':
+        if not image_data:
+            raise ValueError(f"Could not load image {parsed['image']}")
+        media_dict = mastodon_client.media_post(image_data, mime_type='image/jpeg')
+        mastodon_client.status_post(text_content, media_ids=[media_dict['id']])
+    
+    else:
+        # Text only
+        mastodon_client.status_post(text_content)
+
+def social_credentials_configured():
+    """Check that both Bluesky and Mastodon credentials are set"""
+    return all(get_setting(key) for key in
+               ('bluesky_handle', 'bluesky_password', 'mastodon_url', 'mastodon_token'))
+
+def publish_post(content):
+    """Post content to social media and add it to posted.txt, returns success"""
+    # Checked before any page or image is downloaded for the preview
+    if not social_credentials_configured():
+        print("Error: Social media credentials not configured")
+        return False
+    
+    preview = prepare_link_preview(content)
+    if not post_to_social_media(content, preview):
+        return False
+    add_to_posted(content, preview)
+    return True
+
+def post_to_social_media(content, preview=None):
+    """Post content to Bluesky and Mastodon
+    
+    preview is an optional result of prepare_link_preview for this content.
+    Returns True if at least one network accepted the post.
+    """
     try:
         # Get credentials from database
         bluesky_handle = get_setting('bluesky_handle')
@@ -784,219 +1288,215 @@ def post_to_social_media(content):
         mastodon_url = get_setting('mastodon_url')
         mastodon_token = get_setting('mastodon_token')
         
-        if not all([bluesky_handle, bluesky_password, mastodon_url, mastodon_token]):
+        if not social_credentials_configured():
             print("Error: Social media credentials not configured")
             return False
         
         parsed = parse_content(content)
         
-        bluesky_client = Client()
-        bluesky_client.login(bluesky_handle, bluesky_password)
-        
-        mastodon_client = Mastodon(
+        # Log in to both networks in the background while we fetch metadata
+        bluesky_login = _post_pool.submit(
+            _get_social_client, ('bluesky', bluesky_handle, bluesky_password),
+            _login_bluesky, bluesky_handle, bluesky_password
+        )
+        mastodon_login = _post_pool.submit(
+            _get_social_client, ('mastodon', mastodon_url, mastodon_token),
+            Mastodon,
             access_token=mastodon_token,
             api_base_url=mastodon_url
         )
         
+        # Everything both networks need is fetched once up front, so the
+        # per-network senders below are independent of each other
         image_data = None
         metadata = None
         
         if parsed['type'] == 'url':
-            url = parsed['url']
-            text_content = parsed['text']
-            metadata = fetch_page_metadata(url)
+            if preview is None:
+                preview = prepare_link_preview(content)
+            metadata = preview['metadata']
             
-            # Download image for thumbnail
-            if metadata['image_url']:
-                image_data = download_and_process_image(metadata['image_url'])
-            
-            # Post to Bluesky with embed
-            external_embed = models.AppBskyEmbedExternal.External(
-                uri=url,
-                title=metadata['title'][:300],
-                description=metadata['description'][:1000] if metadata['description'] else ''
-            )
-            
-            # Add thumbnail if available
-            if image_data:
-                blob = upload_image_to_bluesky(bluesky_client, image_data)
-                if blob:
-                    external_embed.thumb = blob.blob
-            
-            embed = models.AppBskyEmbedExternal.Main(external=external_embed)
-            bluesky_client.send_post(text=text_content, embed=embed)
-            
-            # Post to Mastodon
-            post_text = f"{text_content}\n\n{url}"
-            if image_data:
-                media_dict = mastodon_client.media_post(image_data, mime_type='image/jpeg')
-                mastodon_client.status_post(post_text, media_ids=[media_dict['id']])
-            else:
-                mastodon_client.status_post(post_text)
+            # Encode image for thumbnail
+            if preview['image'] is not None:
+                image_data = encode_post_image(preview['image'])
         
         elif parsed['type'] == 'image':
-            image_filename = parsed['image']
-            text_content = parsed['text']
-            image_data = load_local_image(image_filename)
-            
-            if image_data:
-                # Post to Bluesky
-                blob = upload_image_to_bluesky(bluesky_client, image_data)
-                if blob:
-                    image_embed = models.AppBskyEmbedImages.Image(alt="", image=blob.blob)
-                    embed = models.AppBskyEmbedImages.Main(images=[image_embed])
-                    bluesky_client.send_post(text=text_content, embed=embed)
-                
-                # Post to Mastodon
-                media_dict = mastodon_client.media_post(image_data, mime_type='image/jpeg')
-                mastodon_client.status_post(text_content, media_ids=[media_dict['id']])
+            image_data = load_local_image(parsed['image'])
         
-        else:
-            # Text only
-            text_content = parsed['text']
-            bluesky_client.send_post(text=text_content)
-            mastodon_client.status_post(text_content)
+        bluesky_client = bluesky_login.result()
+        mastodon_client = mastodon_login.result()
+        
+        futures = {
+            'Bluesky': _post_pool.submit(_post_to_bluesky, bluesky_client, parsed, metadata, image_data),
+            'Mastodon': _post_pool.submit(_post_to_mastodon, mastodon_client, parsed, image_data)
+        }
+        wait(futures.values())
         
-        return True
+        # Once either network has the post it counts as posted, otherwise a
+        # retry from the queue would post it to the other network again
+        failed = [name for name, future in futures.items() if future.exception()]
+        for name in failed:
+            print(f"Error posting to {name}: {futures[name].exception()}")
+        if failed:
+            with _social_clients_lock:
+                _social_clients.clear()
+        return len(failed) < len(futures)
     
     except Exception as e:
         print(f"Error posting to social media: {e}")
+        # Log in fresh next time in case a session went stale
+        with _social_clients_lock:
+            _social_clients.clear()
         import traceback
         traceback.print_exc()
         return False
 
-def add_to_posted(content):
-    """Add entry to posted.txt with timestamp and metadata"""
+def _link_fields(url, preview=None):
+    """Get the (headline, image filename, summary) fields of a posted link"""
+    headline = 'NULL'
+    image_filename = 'NULL'
+    summary = 'NULL'
+    
+    # Fetch metadata
+    try:
+        metadata = preview['metadata'] if preview else fetch_page_metadata(url)
+        headline = metadata.get('title', 'NULL').replace('|', '-')  # Remove pipes to avoid conflicts
+        
+        # Get description/summary
+        description = metadata.get('description', '')
+        if description:
+            summary = description[:200].replace('|', '-')
+            if len(description) > 200:
+                summary += '...'
+        
+        # Download and save image
+        image_url = metadata.get('image_url')
+        if image_url:
+            try:
+                # Create unique filename from URL hash (12 hex chars)
+                url_hash = hashlib.blake2b(url.encode(), digest_size=6).hexdigest()
+                image_filename_local = f"link_{url_hash}.jpg"
+                image_path = os.path.join(IMAGES_FOLDER, image_filename_local)
+                
+                # Reuse the image already downloaded for posting if we have it
+                img = preview['image'] if preview else download_image(image_url)
+                
+                if img is not None:
+                    save_link_thumbnail(img, image_path)
+                    image_filename = image_filename_local
+                    print(f"✓ Saved link image: {image_filename}")
+            except Exception as e:
+                print(f"Error downloading/processing link image: {e}")
+    except Exception as e:
+        print(f"Error fetching metadata: {e}")
+    
+    return headline, image_filename, summary
+
+def add_to_posted(content, preview=None):
+    """Add entry to posted.txt with timestamp and metadata
+    
+    preview is an optional result of prepare_link_preview for this content.
+    """
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     
     # Parse the content
     parsed = parse_content(content)
+    commentary = parsed['text'].replace('|', '-') if parsed['text'] else 'NULL'
     
-    # Initialize metadata fields
+    # Only links need any lookups, text and image posts are just the line
     url = 'NULL'
     headline = 'NULL'
     image_filename = 'NULL'
     summary = 'NULL'
-    commentary = 'NULL'
     
     if parsed['type'] == 'url':
         url = parsed['url']
-        commentary = parsed['text'].replace('|', '-') if parsed['text'] else 'NULL'
-        
-        # Fetch metadata
-        try:
-            metadata = fetch_page_metadata(url)
-            headline = metadata.get('title', 'NULL').replace('|', '-')  # Remove pipes to avoid conflicts
-            
-            # Get description/summary
-            description = metadata.get('description', '')
-            if description:
-                summary = description[:200].replace('|', '-')
-                if len(description) > 200:
-                    summary += '...'
-            
-            # Download and save image
-            image_url = metadata.get('image_url')
-            if image_url:
-                try:
-                    import hashlib
-                    # Create unique filename from URL hash
-                    url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
-                    image_filename_local = f"link_{url_hash}.jpg"
-                    image_path = os.path.join(IMAGES_FOLDER, image_filename_local)
-                    
-                    # Download image
-                    headers = {'User-Agent': USER_AGENT}
-                    img_response = requests.get(image_url, headers=headers, timeout=10)
-                    img_response.raise_for_status()
-                    
-                    # Process and crop image to 300x200
-                    img = Image.open(BytesIO(img_response.content))
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        img = img.convert('RGB')
-                    
-                    # Calculate crop to 3:2 ratio (300x200)
-                    target_ratio = 600 / 400  # 1.5
-                    img_ratio = img.width / img.height
-                    
-                    if img_ratio > target_ratio:
-                        # Image is wider, crop width
-                        new_width = int(img.height * target_ratio)
-                        left = (img.width - new_width) // 2
-                        img = img.crop((left, 0, left + new_width, img.height))
-                    else:
-                        # Image is taller, crop height
-                        new_height = int(img.width / target_ratio)
-                        top = (img.height - new_height) // 2
-                        img = img.crop((0, top, img.width, top + new_height))
-                    
-                    # Resize to exactly 300x200
-                    img = img.resize((600, 400), Image.Resampling.LANCZOS)
-                    
-                    # Save
-                    img.save(image_path, format='JPEG', quality=85)
-                    image_filename = image_filename_local
-                    print(f"✓ Saved link image: {image_filename}")
-                except Exception as e:
-                    print(f"Error downloading/processing link image: {e}")
-        except Exception as e:
-            print(f"Error fetching metadata: {e}")
-    
+        headline, image_filename, summary = _link_fields(url, preview)
     elif parsed['type'] == 'image':
         image_filename = parsed['image']
-        commentary = parsed['text'].replace('|', '-') if parsed['text'] else 'NULL'
-    
-    else:
-        # Text only
-        commentary = parsed['text'].replace('|', '-') if parsed['text'] else 'NULL'
     
     # Build the pipe-delimited line
     # Format: [DATETIME]|url|headline|imageFilename|summary|commentary
     line = f"[{timestamp}]|{url}|{headline}|{image_filename}|{summary}|{commentary}\n"
     
-    with open(POSTED_FILE, 'a', encoding='utf-8') as f:
-        f.write(line)
+    os.write(_posted_fd, line.encode('utf-8'))
+    
+    with get_conn() as conn:
+        _insert_posts(conn, [parse_posted_line(line)])
+
+# Scheduled posting
+AUTO_POST_INTERVAL = 3600  # Post from the queue once an hour
+AUTO_POST_RETRY = 60       # Re-check this often when a post is due but didn't happen
 
-# Scheduled posting thread
-def auto_poster_thread():
-    """Background thread that posts from queue hourly"""
+def auto_post_from_queue():
+    """Post the first queued entry if the hourly interval has passed"""
     global last_auto_post_time
+    refresh_settings()
     
-    while True:
-        time.sleep(60)
-        
-        with post_lock:  # Acquire lock before checking/posting
-            if time.time() - last_auto_post_time >= 3600:
-                try:
-                    with open(TOPOST_FILE, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
+    with post_lock:  # Acquire lock before checking/posting
+        if time.time() - last_auto_post_time < AUTO_POST_INTERVAL:
+            return
+        try:
+            queued = peek_queue()
+            
+            if queued:
+                queue_id, line_to_post = queued
+                
+                # Don't download anything for a post that can't be sent
+                if not social_credentials_configured():
+                    print("Error: Social media credentials not configured")
+                    return
+                
+                # Posting can take a while, so no write lock is held over it.
+                # The entry is removed by id afterwards, which stays correct
+                # even if the queue was edited in the meantime.
+                preview = prepare_link_preview(line_to_post)
+                if post_to_social_media(line_to_post, preview):
+                    # Remove from queue FIRST
+                    remove_queued(queue_id)
                     
-                    if lines:
-                        line_to_post = lines[0].strip()
-                        
-                        if not line_to_post:
-                            remaining_lines = lines[1:]
-                            with open(TOPOST_FILE, 'w', encoding='utf-8') as f:
-                                f.writelines(remaining_lines)
-                            continue
-                        
-                        remaining_lines = lines[1:]
-                        
-                        if post_to_social_media(line_to_post):
-                            # Remove from queue FIRST
-                            with open(TOPOST_FILE, 'w', encoding='utf-8') as f:
-                                f.writelines(remaining_lines)
-                            
-                            # Then add to posted
-                            add_to_posted(line_to_post)
-                            print(f"Auto-posted: {line_to_post}")
-                            last_auto_post_time = time.time()
-                        else:
-                            print(f"Failed to auto-post: {line_to_post}")
-                except FileNotFoundError:
-                    pass
-                except Exception as e:
-                    print(f"Error in auto-poster: {e}")
+                    # Then add to posted
+                    add_to_posted(line_to_post, preview)
+                    print(f"Auto-posted: {line_to_post}")
+                    last_auto_post_time = time.time()
+                else:
+                    print(f"Failed to auto-post: {line_to_post}")
+        except Exception as e:
+            print(f"Error in auto-poster: {e}")
+
+_auto_post_started = False
+_auto_post_timer = None
+_auto_post_timer_lock = threading.Lock()
+
+def schedule_auto_post():
+    """Arm a one-shot timer for when the next auto-post is due
+    
+    Instead of waking every minute to compare clocks, sleep until the hour
+    is up. Manual posts move last_auto_post_time forward, which the timer
+    picks up when it fires and simply re-arms for the remainder. With the
+    hour up and nothing queued no timer is armed; enqueue_post re-arms it.
+    """
+    global _auto_post_started, _auto_post_timer
+    remaining = AUTO_POST_INTERVAL - (time.time() - last_auto_post_time)
+    with _auto_post_timer_lock:
+        _auto_post_started = True
+        if _auto_post_timer is not None:
+            return  # Already armed
+        if remaining <= 0 and peek_queue() is None:
+            return
+        _auto_post_timer = threading.Timer(remaining if remaining > 0 else AUTO_POST_RETRY,
+                                           _auto_post_timer_fired)
+        _auto_post_timer.daemon = True
+        _auto_post_timer.start()
+
+def _auto_post_timer_fired():
+    global _auto_post_timer
+    with _auto_post_timer_lock:
+        _auto_post_timer = None
+    try:
+        auto_post_from_queue()
+    finally:
+        schedule_auto_post()
 
 def rss_checker_thread():
     """Background thread that checks RSS feeds every 15 minutes"""
@@ -1009,11 +1509,8 @@ def rss_checker_thread():
 
 def delete_rss_feed(feed_id):
     """Delete an RSS feed from the database"""
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('DELETE FROM rss_feeds WHERE id = ?', (feed_id,))
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute('DELETE FROM rss_feeds WHERE id = ?', (feed_id,))
 
 # Flask routes
 @app.route('/')
@@ -1023,19 +1520,20 @@ def index():
     search = request.args.get('search', '')
     
     result = get_posted_entries(page=page, per_page=20, search_query=search if search else None)
-    queue = get_queue_entries()
+    queue_count = get_queue_count()
     
-    # Debug output
-    print(f"DEBUG: Found {len(result['entries'])} entries for page {page}")
-    if result['entries']:
-        print(f"DEBUG: First entry: {result['entries'][0]}")
+    # Debug output, only formatted when the app runs in debug mode
+    if app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug("Found %d entries for page %d", len(result['entries']), page)
+        if result['entries']:
+            app.logger.debug("First entry: %s", result['entries'][0])
     
     if 'user_id' in session:
         return render_template('index.html', 
                              entries=result['entries'],
                              pagination=result,
                              search=search,
-                             queue_count=len(queue))
+                             queue_count=queue_count)
     else:
         return render_template('index_public.html',
                              entries=result['entries'],
@@ -1083,7 +1581,8 @@ def login():
         password = request.form.get('password', '').strip()
         
         user = get_user(username)
-        if user and check_password_hash(user['password_hash'], password):
+        password_hash = user['password_hash'] if user else _DUMMY_PASSWORD_HASH
+        if check_password_hash(password_hash, password) and user:
             session['user_id'] = user['id']
             session['username'] = user['username']
             flash('Logged in successfully!', 'success')
@@ -1105,18 +1604,19 @@ def logout():
 def settings():
     """Settings page for API credentials and site configuration"""
     if request.method == 'POST':
-        # API credentials
-        set_setting('bluesky_handle', request.form.get('bluesky_handle', '').strip())
-        set_setting('bluesky_password', request.form.get('bluesky_password', '').strip())
-        set_setting('mastodon_url', request.form.get('mastodon_url', '').strip())
-        set_setting('mastodon_token', request.form.get('mastodon_token', '').strip())
-        
         # Site configuration
         site_name = request.form.get('site_name', '').strip()
         social_links = request.form.get('social_links', '').strip()
         
-        set_setting('site_name', site_name if site_name else 'Microblog')
-        set_setting('social_links', social_links)
+        set_settings({
+            # API credentials
+            'bluesky_handle': request.form.get('bluesky_handle', '').strip(),
+            'bluesky_password': request.form.get('bluesky_password', '').strip(),
+            'mastodon_url': request.form.get('mastodon_url', '').strip(),
+            'mastodon_token': request.form.get('mastodon_token', '').strip(),
+            'site_name': site_name if site_name else 'Microblog',
+            'social_links': social_links
+        })
         
         flash('Settings updated successfully!', 'success')
         return redirect(url_for('settings'))
@@ -1170,15 +1670,13 @@ def create_post():
             flash('Posted locally!', 'success')
         elif post_now:
             with post_lock:  # Acquire lock for manual posts too
-                if post_to_social_media(content):
-                    add_to_posted(content)
+                if publish_post(content):
                     flash('Posted successfully!', 'success')
                     last_auto_post_time = time.time()
                 else:
                     flash('Failed to post to social media', 'error')
         else:
-            with open(TOPOST_FILE, 'a', encoding='utf-8') as f:
-                f.write(f"{content}\n")
+            enqueue_post(content)
             flash('Added to queue', 'success')
         
         return redirect(url_for('index'))
@@ -1191,26 +1689,18 @@ def create_post():
 @login_required
 def queue():
     """View posting queue"""
-    queue_entries = get_queue_entries()
+    queue_entries = get_queue_items()
     return render_template('queue.html', queue=queue_entries)
 
-@app.route('/delete_queue/<int:index>', methods=['POST'])
+@app.route('/delete_queue/<int:queue_id>', methods=['POST'])
 @login_required
-def delete_queue_item(index):
+def delete_queue_item(queue_id):
     """Delete an item from the queue"""
     try:
-        with open(TOPOST_FILE, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        if 0 <= index < len(lines):
-            del lines[index]
-            
-            with open(TOPOST_FILE, 'w', encoding='utf-8') as f:
-                f.writelines(lines)
-            
+        if remove_queued(queue_id):
             flash('Queue item deleted', 'success')
         else:
-            flash('Invalid queue index', 'error')
+            flash('Queue item not found', 'error')
     
     except Exception as e:
         flash(f'Error deleting queue item: {str(e)}', 'error')
@@ -1228,8 +1718,7 @@ def rss():
 @login_required
 def toggle_rss_auto_queue(feed_id):
     """Toggle auto-queue for an RSS feed"""
-    feeds = get_rss_feeds()
-    feed = next((f for f in feeds if f['id'] == feed_id), None)
+    feed = get_rss_feed(feed_id)
     
     if not feed:
         flash('RSS feed not found', 'error')
@@ -1250,8 +1739,7 @@ def toggle_rss_auto_queue(feed_id):
 @login_required
 def cycle_rss_auto_post_mode(feed_id):
     """Cycle through auto-post modes: queue -> social -> local -> queue"""
-    feeds = get_rss_feeds()
-    feed = next((f for f in feeds if f['id'] == feed_id), None)
+    feed = get_rss_feed(feed_id)
     
     if not feed:
         flash('RSS feed not found', 'error')
@@ -1310,8 +1798,7 @@ def delete_rss(feed_id):
 @login_required
 def browse_rss(feed_id):
     """Browse entries from a specific RSS feed"""
-    feeds = get_rss_feeds()
-    feed = next((f for f in feeds if f['id'] == feed_id), None)
+    feed = get_rss_feed(feed_id)
     
     if not feed:
         flash('RSS feed not found', 'error')
@@ -1352,16 +1839,14 @@ def add_rss_to_queue():
         add_to_posted(content)
         flash('Posted locally!', 'success')
     elif post_now:
-        if post_to_social_media(content):
-            add_to_posted(content)
+        if publish_post(content):
             flash('Posted successfully!', 'success')
             global last_auto_post_time
             last_auto_post_time = time.time()
         else:
             flash('Failed to post to social media', 'error')
     else:
-        with open(TOPOST_FILE, 'a', encoding='utf-8') as f:
-            f.write(f"{content}\n")
+        enqueue_post(content)
         flash('Added to queue!', 'success')
     
     return redirect(request.referrer or url_for('rss'))
@@ -1382,14 +1867,8 @@ def generate_digest():
     else:
         last_digest = None
     
-    # Get all entries
-    all_entries = get_all_posted_entries()
-    
-    # Filter entries since last digest
-    if last_digest:
-        new_entries = [e for e in all_entries if e['timestamp'] and e['timestamp'] > last_digest]
-    else:
-        new_entries = all_entries
+    # Get entries since last digest, oldest first
+    new_entries = get_posted_entries_since(last_digest)
     
     if not new_entries:
         flash('No new posts since last digest', 'error')
@@ -1400,40 +1879,9 @@ def generate_digest():
     today = datetime.now()
     digest_title = f"{site_name} Link List for {today.strftime('%A %Y-%m-%d')}"
     
-    html_parts = [f'<p>{digest_title}</p>\n']
-    
-    for entry in reversed(new_entries):  # Oldest first
-        # Only include URL posts in digest
-        if entry.get('url'):
-            # Format date
-            date_str = entry['timestamp'].strftime('%d-%b-%Y') if entry['timestamp'] else 'Unknown'
-            
-            # Build card HTML
-            card_html = '<div class="link_list_card">'
-            
-            # Image - use saved image or fallback to RSS icon
-            if entry.get('image'):
-                card_html += f'<div class="link_card_image"><img src="/images/{entry["image"]}" class="link_card_image_thumb" height="150" alt="link image"></div>'
-            else:
-                card_html += '<div class="link_card_image"><img src="/images/rss.png" class="link_card_image_thumb" height="150" alt="link image"></div>'
-            
-            # Date and link with headline
-            card_html += f'<span class="link_list_date">{date_str}</span> - '
-            headline = entry.get('headline') or entry['url']
-            card_html += f'<a class="link_list_link" href="{entry["url"]}">{headline}</a></p>'
-            
-            # Brief Summary (if available)
-            if entry.get('summary'):
-                card_html += f'<p><span class="link_list_summary_title">Brief Summary:</span> <span class="link_list_summary">"{entry["summary"]}"</span></p>'
-            
-            # Personal commentary (if available)
-            if entry.get('commentary'):
-                card_html += f'<p><span class="link_list_summary_title">Personal Notes and Commentary:</span> <span class="link_list_summary">"{entry["commentary"]}"</span></p>'
-            
-            card_html += '</div>\n'
-            html_parts.append(card_html)
-    
-    digest_html = '\n'.join(html_parts)
+    # Only include URL posts in digest
+    digest_html = render_template('digest.html', title=digest_title,
+                                  entries=[e for e in new_entries if e.get('url')])
     
     # Update last digest date
     set_setting('last_digest_date', today.strftime('%Y-%m-%d %H:%M:%S'))
@@ -1453,9 +1901,8 @@ def serve_image(filename):
     return send_from_directory(IMAGES_FOLDER, filename)
 
 if __name__ == "__main__":
-    # Start auto-poster thread
-    poster_thread = threading.Thread(target=auto_poster_thread, daemon=True)
-    poster_thread.start()
+    # Start auto-poster timer
+    schedule_auto_post()
     
     # Start RSS checker thread
     rss_thread = threading.Thread(target=rss_checker_thread, daemon=True)
@@ -6,28 +6,22 @@ Duplicates are identified by URL (the second field after splitting by |)
 """
 
 import sys
-from datetime import datetime
 
-def parse_date(line):
-    """Extract and parse the date from a line."""
-    try:
-        # Extract the date string between brackets
-        date_str = line.split(']')[0].replace('[', '')
-        return datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-    except (ValueError, IndexError):
-        # Return a very old date for lines that can't be parsed
-        # This will put them at the beginning
-        return datetime.min
+def date_key(line):
+    """Get a sort key for a line's date."""
+    # [YYYY-MM-DD HH:MM:SS] already sorts correctly as text, so no parsing
+    # is needed. Lines without a timestamp get '' to put them at the beginning
+    if line.startswith('[') and line[20:21] == ']':
+        return line[1:20]
+    return ''
 
 def extract_url(line):
     """Extract the URL from a line (second field after splitting by |)."""
-    try:
-        parts = line.split('|')
-        if len(parts) >= 2:
-            return parts[1].strip()
-    except:
-        pass
-    return None
+    start = line.find('|')
+    if start == -1:
+        return None
+    end = line.find('|', start + 1)
+    return line[start + 1:end if end != -1 else len(line)].strip()
 
 def sort_markdown_file(input_file, output_file=None):
     """
@@ -41,22 +35,17 @@ def sort_markdown_file(input_file, output_file=None):
     with open(input_file, 'r', encoding='utf-8') as f:
         lines = f.readlines()
     
-    # Remove duplicates based on URL, keeping the first occurrence
-    seen_urls = set()
-    unique_lines = []
-    duplicates_removed = 0
-    
-    for line in lines:
+    # Remove duplicates based on URL, keeping the first occurrence. Lines
+    # without a URL (including NULL ones) are keyed by position so they all stay
+    unique = {}
+    for i, line in enumerate(lines):
         url = extract_url(line)
-        if url and url in seen_urls:
-            duplicates_removed += 1
-            continue
-        if url:
-            seen_urls.add(url)
-        unique_lines.append(line)
+        unique.setdefault(url if url and url != 'NULL' else i, line)
+    unique_lines = list(unique.values())
+    duplicates_removed = len(lines) - len(unique_lines)
     
     # Sort lines by their date
-    sorted_lines = sorted(unique_lines, key=parse_date)
+    sorted_lines = sorted(unique_lines, key=date_key)
     
     # Write to output file
     output_path = output_file if output_file else input_file
@@ -67,6 +56,8 @@ def sort_markdown_file(input_file, output_file=None):
     print(f"Removed {duplicates_removed} duplicate(s)")
     print(f"Sorted {len(sorted_lines)} unique lines")
     print(f"Output written to: {output_path}")
+    print("If this is the app's posted.txt, run debug_scripts/debug_rebuild_posts.py")
+    print("so microblog.db picks up the changes, then restart the Flask app.")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
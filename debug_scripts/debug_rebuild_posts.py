@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Run from the app directory (stop the app first), like the other debug scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import POSTED_FILE, rebuild_posts
+
+count = rebuild_posts()
+print(f"Rebuilt the posts table from {POSTED_FILE}: {count} entries")
@@ -5,24 +5,40 @@ Migration script to convert old posted.txt format to new pipe-delimited format
 Old format: [DATETIME] content
 New format: [DATETIME]|url|headline|imageFilename|summary|commentary
 
-Run this once to migrate your existing posts.
+Run this once to migrate your existing posts, with the Flask app stopped.
 It will backup the old file to posted.txt.backup before converting.
+The app only imports posted.txt into microblog.db when it has no posts yet,
+so run debug_rebuild_posts.py afterwards to load the migrated entries.
 """
 
 import os
+import re
 import sys
+import codecs
+import hashlib
 import requests
 import shutil
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from urllib.parse import urljoin
 from io import BytesIO
 from PIL import Image
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
 
 POSTED_FILE = 'posted.txt'
 BACKUP_FILE = 'posted.txt.backup'
+TEMP_FILE = 'posted.txt.tmp'
 IMAGES_FOLDER = 'images'
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+MAX_WORKERS = 16  # Entries migrated in parallel, each is mostly network wait
+BATCH_SIZE = MAX_WORKERS * 4  # Lines read ahead of the workers
+
+# Content prefixes and file extensions that mark link and image posts
+URL_PREFIXES = ('http://', 'https://', 'www.')
+IMAGE_EXT_RE = re.compile(r'\.(?:jpg|jpeg|png|gif|webp|bmp|tiff)$', re.IGNORECASE)
 
 # Ensure images folder exists
 os.makedirs(IMAGES_FOLDER, exist_ok=True)
@@ -37,54 +53,64 @@ def parse_content(content):
     second_part = parts[1].strip()
     
     # Check if URL
-    if first_part.startswith(('http://', 'https://', 'www.')):
+    if first_part.startswith(URL_PREFIXES):
         return {'type': 'url', 'url': first_part, 'text': second_part}
     
     # Check if image
-    image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff')
-    if any(first_part.lower().endswith(ext) for ext in image_extensions):
+    if IMAGE_EXT_RE.search(first_part):
         return {'type': 'image', 'image': first_part, 'text': second_part}
     
     return {'type': 'text', 'text': content}
 
+# Shared by all workers, so connections to the same host get reused. The
+# pool holds one connection per worker for each of the most recent hosts
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': USER_AGENT})
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=MAX_WORKERS,
+                       max_retries=Retry(total=2, backoff_factor=0.3))
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
+# Metadata tags all live in <head>, so nothing after it needs parsing
+HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
 def fetch_page_metadata(url):
     """Fetch page title, description, and featured image from URL"""
     try:
-        headers = {'User-Agent': USER_AGENT}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = SESSION.get(url, timeout=10)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        html = response.content
+        head_end = HEAD_END_RE.search(html)
+        head = html[:head_end.start()] if head_end else html[:65536]
+        
+        # libxml2 assumes Latin-1 without a declaration, so pick the encoding here
+        charset = CHARSET_RE.search(head)
+        try:
+            encoding = codecs.lookup(charset.group(1).decode('ascii')).name if charset else 'utf-8'
+        except LookupError:
+            encoding = 'utf-8'
+        tree = lxml_html.fromstring(head, parser=lxml_html.HTMLParser(encoding=encoding))
+        
+        # Collect every meta tag in one pass, keeping the first non-empty value
+        meta = {}
+        for tag in tree.xpath('//meta[@property or @name]'):
+            content = (tag.get('content') or '').strip()
+            if content:
+                meta.setdefault(tag.get('property') or tag.get('name'), content)
         
         title = None
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text().strip()
-        
-        og_title = soup.find('meta', property='og:title')
-        if og_title and og_title.get('content'):
-            title = og_title.get('content').strip()
-        
-        description = None
-        og_desc = soup.find('meta', property='og:description')
-        if og_desc and og_desc.get('content'):
-            description = og_desc.get('content').strip()
-        else:
-            meta_desc = soup.find('meta', attrs={'name': 'description'})
-            if meta_desc and meta_desc.get('content'):
-                description = meta_desc.get('content').strip()
-        
-        image_url = None
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            image_url = og_image.get('content').strip()
-            image_url = urljoin(url, image_url)
+        title_tag = tree.find('.//title')
+        if title_tag is not None:
+            title = title_tag.text_content().strip()
+        title = meta.get('og:title') or title
+        
+        description = meta.get('og:description') or meta.get('description')
         
-        if not image_url:
-            twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-            if twitter_image and twitter_image.get('content'):
-                image_url = twitter_image.get('content').strip()
-                image_url = urljoin(url, image_url)
+        image_url = meta.get('og:image') or meta.get('twitter:image')
+        if image_url:
+            image_url = urljoin(url, image_url)
         
         return {
             'title': title or url,
@@ -98,11 +124,13 @@ def fetch_page_metadata(url):
 def download_and_crop_image(image_url, url_hash):
     """Download and crop image to 300x200"""
     try:
-        headers = {'User-Agent': USER_AGENT}
-        img_response = requests.get(image_url, headers=headers, timeout=10)
+        img_response = SESSION.get(image_url, timeout=10)
         img_response.raise_for_status()
         
         img = Image.open(BytesIO(img_response.content))
+        
+        # JPEGs can be decoded straight at reduced scale, still at least 300x200
+        img.draft('RGB', (300, 200))
         if img.mode in ('RGBA', 'LA', 'P'):
             img = img.convert('RGB')
         
@@ -114,15 +142,16 @@ def download_and_crop_image(image_url, url_hash):
             # Image is wider, crop width
             new_width = int(img.height * target_ratio)
             left = (img.width - new_width) // 2
-            img = img.crop((left, 0, left + new_width, img.height))
+            crop_box = (left, 0, left + new_width, img.height)
         else:
             # Image is taller, crop height
             new_height = int(img.width / target_ratio)
             top = (img.height - new_height) // 2
-            img = img.crop((0, top, img.width, top + new_height))
+            crop_box = (0, top, img.width, top + new_height)
         
-        # Resize to exactly 300x200
-        img = img.resize((300, 200), Image.Resampling.LANCZOS)
+        # Crop and resize to exactly 300x200 in one pass; reducing_gap does
+        # most of the shrinking with a cheap box reduce first
+        img = img.resize((300, 200), Image.Resampling.LANCZOS, box=crop_box, reducing_gap=3.0)
         
         # Save
         image_filename = f"link_{url_hash}.jpg"
@@ -185,8 +214,7 @@ def migrate_line(line):
                 summary += '...'
         
         if metadata['image_url']:
-            import hashlib
-            url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
+            url_hash = hashlib.blake2b(url.encode(), digest_size=6).hexdigest()
             print(f"  Downloading and cropping image...")
             image_filename_local = download_and_crop_image(metadata['image_url'], url_hash)
             if image_filename_local:
@@ -219,36 +247,40 @@ def main():
     shutil.copy2(POSTED_FILE, BACKUP_FILE)
     print("   ✓ Backup created")
     
-    # Read all lines
-    print(f"\n2. Reading {POSTED_FILE}")
-    with open(POSTED_FILE, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    print(f"   Found {len(lines)} lines")
-    
-    # Migrate each line
-    print("\n3. Migrating entries...")
-    new_lines = []
-    for i, line in enumerate(lines, 1):
-        print(f"\n   Processing entry {i}/{len(lines)}:")
-        new_line = migrate_line(line)
-        if new_line:
-            new_lines.append(new_line)
-            print("   ✓ Migrated")
-        else:
-            print("   ✗ Skipped")
+    # Stream entries through the workers into a temp file
+    print(f"\n2. Migrating entries into {TEMP_FILE}...")
+    total = 0
+    migrated = 0
+    with open(POSTED_FILE, 'r', encoding='utf-8') as in_f, \
+         open(TEMP_FILE, 'w', encoding='utf-8') as out_f, \
+         ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Only a batch of lines is in memory at once. map() hands results
+        # back in file order, so the output order is kept
+        while True:
+            batch = list(islice(in_f, BATCH_SIZE))
+            if not batch:
+                break
+            for new_line in executor.map(migrate_line, batch):
+                total += 1
+                if new_line:
+                    out_f.write(new_line)
+                    migrated += 1
+                    print(f"   ✓ Migrated entry {total}")
+                else:
+                    print(f"   ✗ Skipped entry {total}")
     
-    # Write new format
-    print(f"\n4. Writing migrated data to {POSTED_FILE}")
-    with open(POSTED_FILE, 'w', encoding='utf-8') as f:
-        f.writelines(new_lines)
-    print(f"   ✓ Wrote {len(new_lines)} entries")
+    # Swap the new file in
+    print(f"\n3. Replacing {POSTED_FILE}")
+    os.replace(TEMP_FILE, POSTED_FILE)
+    print(f"   ✓ Wrote {migrated} entries")
     
     print("\n" + "=" * 60)
     print("Migration complete!")
     print("=" * 60)
     print(f"\nOriginal file backed up to: {BACKUP_FILE}")
-    print(f"Migrated {len(new_lines)} out of {len(lines)} entries")
-    print("\nYou can now restart your Flask app.")
+    print(f"Migrated {migrated} out of {total} entries")
+    print("\nNow run debug_scripts/debug_rebuild_posts.py to load the migrated")
+    print("entries into microblog.db, then restart your Flask app.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file